@@ -3,7 +3,9 @@ import numpy as np
 from pathlib import Path
 import logging
 from typing import Dict, List, Tuple
-import json
+import orjson
+import pyarrow as pa
+import pyarrow.dataset as ds
 
 # Set up logging
 logging.basicConfig(
@@ -12,6 +14,40 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Per-wallet deposit statistics and how partial results are combined
+DEPOSIT_AGGREGATIONS = [
+    ('first_deposit', 'min'),
+    ('last_deposit', 'max'),
+    ('largest_deposit_usd', 'max'),
+    ('smallest_deposit_usd', 'min')
+]
+
+def _deposit_stats(deposits) -> pa.Table:
+    """Lay out deposits (a table or record batch) as one column per statistic."""
+    return pa.table({
+        'account_id': deposits['account_id'],
+        'first_deposit': deposits['timestamp'],
+        'last_deposit': deposits['timestamp'],
+        'largest_deposit_usd': deposits['amount_usd'],
+        'smallest_deposit_usd': deposits['amount_usd']
+    })
+
+def _reduce_by_wallet(stats: pa.Table) -> pa.Table:
+    """Reduce the statistic columns to one row per wallet, keeping their names."""
+    reduced = stats.group_by('account_id').aggregate(DEPOSIT_AGGREGATIONS)
+    return pa.table({
+        'account_id': reduced['account_id'],
+        **{name: reduced[f'{name}_{how}'] for name, how in DEPOSIT_AGGREGATIONS}
+    })
+
+def _rows_by_id(frame: pd.DataFrame) -> Dict[str, Dict]:
+    """Map each row label to a dict of its fields, keeping numpy scalar types."""
+    columns = {column: frame[column].to_numpy() for column in frame.columns}
+    return {
+        row_id: {column: values[i] for column, values in columns.items()}
+        for i, row_id in enumerate(frame.index)
+    }
+
 class WalletAnalyzer:
     def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
@@ -20,89 +56,97 @@ class WalletAnalyzer:
         self.analysis_dir = self.processed_dir / "analysis"
         self.analysis_dir.mkdir(parents=True, exist_ok=True)
 
-    def load_data(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    def load_data(self) -> Tuple[pd.DataFrame, ds.Dataset]:
         """Load all necessary data for analysis."""
         # Load features
-        features_file = self.features_dir / "wallet_features.csv"
-        features_df = pd.read_csv(features_file, index_col=0)
-        
-        # Load raw deposits
-        deposits_file = self.processed_dir / "processed_deposits.csv"
-        deposits_df = pd.read_csv(deposits_file)
+        features_file = self.features_dir / "wallet_features.parquet"
+        features_df = pd.read_parquet(features_file, engine='pyarrow')
         
-        # Convert timestamp to datetime
-        deposits_df['timestamp'] = pd.to_datetime(deposits_df['timestamp'])
+        # Open raw deposits as a dataset; they are scanned batch by batch later
+        deposits_file = self.processed_dir / "processed_deposits.parquet"
+        deposits = ds.dataset(deposits_file, format='parquet')
         
-        return features_df, deposits_df
+        return features_df, deposits
 
-    def format_timestamp(self, ts) -> str:
-        """Safely format a timestamp."""
-        try:
-            if pd.isna(ts):
-                return "N/A"
-            return pd.Timestamp(ts).strftime('%Y-%m-%d')
-        except:
-            return "N/A"
-
-    def analyze_wallet(self, wallet_id: str, features_df: pd.DataFrame, deposits_df: pd.DataFrame) -> Dict:
-        """Analyze a single wallet's behavior."""
-        # Get wallet features
-        wallet_features = features_df.loc[wallet_id]
-        
-        # Get wallet deposits
-        wallet_deposits = deposits_df[deposits_df['account_id'] == wallet_id]
+    def aggregate_deposits(self, deposits: ds.Dataset, wallet_ids: pd.Index) -> pd.DataFrame:
+        """Aggregate deposit statistics for the given wallets, one record batch at a time."""
+        # Read only the needed columns of the given wallets' deposits
+        batches = deposits.to_batches(
+            columns=['account_id', 'timestamp', 'amount_usd'],
+            filter=ds.field('account_id').isin(wallet_ids.tolist())
+        )
         
+        # Fold each batch into a running per-wallet aggregate; min/max of the
+        # partial results gives the min/max over all deposits
+        stats = _deposit_stats(deposits.schema.empty_table())
+        for batch in batches:
+            stats = _reduce_by_wallet(pa.concat_tables([stats, _deposit_stats(batch)]))
+        return stats.to_pandas().set_index('account_id')
+
+    def analyze_wallet(self, wallet_id: str, wallet_features: Dict, wallet_deposits: Dict) -> Dict:
+        """Analyze a single wallet's behavior from its features and aggregated deposits."""
         analysis = {
             'wallet_id': wallet_id,
-            'score': float(wallet_features['final_score']),
+            'score': wallet_features['final_score'],
             'activity_metrics': {
-                'total_deposits': int(wallet_features['total_deposits_count']),
-                'deposit_consistency': float(wallet_features['deposit_consistency']),
-                'unique_assets': int(wallet_features['unique_assets_count']),
-                'activity_score': float(wallet_features['activity_score'])
+                'total_deposits': wallet_features['total_deposits_count'],
+                'deposit_consistency': wallet_features['deposit_consistency'],
+                'unique_assets': wallet_features['unique_assets_count'],
+                'activity_score': wallet_features['activity_score']
             },
             'value_metrics': {
-                'total_value_usd': float(wallet_features['total_deposit_usd']),
-                'avg_deposit_usd': float(wallet_features['avg_deposit_usd']),
-                'value_consistency': float(wallet_features['deposit_value_consistency']),
-                'value_score': float(wallet_features['value_score'])
+                'total_value_usd': wallet_features['total_deposit_usd'],
+                'avg_deposit_usd': wallet_features['avg_deposit_usd'],
+                'value_consistency': wallet_features['deposit_value_consistency'],
+                'value_score': wallet_features['value_score']
             },
             'longevity_metrics': {
-                'timespan_days': float(wallet_features['deposit_timespan_days']),
-                'avg_days_between_deposits': float(wallet_features['avg_days_between_deposits']),
-                'longevity_score': float(wallet_features['longevity_score'])
+                'timespan_days': wallet_features['deposit_timespan_days'],
+                'avg_days_between_deposits': wallet_features['avg_days_between_deposits'],
+                'longevity_score': wallet_features['longevity_score']
             },
             'asset_usage': {
-                'most_used_asset': str(wallet_features['most_used_asset']),
-                'asset_concentration': float(wallet_features['asset_concentration'])
+                'most_used_asset': wallet_features['most_used_asset'],
+                'asset_concentration': wallet_features['asset_concentration']
             },
             'behavioral_patterns': {
-                'first_deposit': self.format_timestamp(wallet_deposits['timestamp'].min()),
-                'last_deposit': self.format_timestamp(wallet_deposits['timestamp'].max()),
-                'largest_deposit_usd': float(wallet_deposits['amount_usd'].max() if len(wallet_deposits) > 0 else 0),
-                'smallest_deposit_usd': float(wallet_deposits['amount_usd'].min() if len(wallet_deposits) > 0 else 0)
+                'first_deposit': wallet_deposits['first_deposit'],
+                'last_deposit': wallet_deposits['last_deposit'],
+                'largest_deposit_usd': wallet_deposits['largest_deposit_usd'],
+                'smallest_deposit_usd': wallet_deposits['smallest_deposit_usd']
             }
         }
         
         return analysis
 
-    def generate_analysis_report(self, features_df: pd.DataFrame, deposits_df: pd.DataFrame):
+    def generate_analysis_report(self, features_df: pd.DataFrame, deposits: ds.Dataset):
         """Generate analysis report for top and bottom wallets."""
-        # Sort wallets by score
-        sorted_wallets = features_df.sort_values('final_score', ascending=False)
+        # Select the highest and lowest scoring wallets, both ordered by descending score
+        top_wallets = features_df.nlargest(5, 'final_score')
+        bottom_wallets = features_df.nsmallest(5, 'final_score').iloc[::-1]
+        
+        # Aggregate the deposits of the analysed wallets in one scan instead of
+        # filtering them for every wallet, and format their dates in one go
+        selected_ids = top_wallets.index.union(bottom_wallets.index)
+        dep_agg = self.aggregate_deposits(deposits, selected_ids).reindex(selected_ids)
+        for column in ('first_deposit', 'last_deposit'):
+            dep_agg[column] = dep_agg[column].dt.strftime('%Y-%m-%d').fillna('N/A')
+        
+        # Convert the analysed rows to dicts once, for cheap per-field lookups;
+        # values stay numpy scalars so float32 scores serialize at their precision
+        selected_features = _rows_by_id(features_df.loc[selected_ids])
+        selected_deposits = _rows_by_id(dep_agg)
         
         # Analyze top 5 wallets
-        top_wallets = sorted_wallets.head(5)
         top_analyses = []
         for wallet_id in top_wallets.index:
-            analysis = self.analyze_wallet(wallet_id, features_df, deposits_df)
+            analysis = self.analyze_wallet(wallet_id, selected_features[wallet_id], selected_deposits[wallet_id])
             top_analyses.append(analysis)
             
         # Analyze bottom 5 wallets
-        bottom_wallets = sorted_wallets.tail(5)
         bottom_analyses = []
         for wallet_id in bottom_wallets.index:
-            analysis = self.analyze_wallet(wallet_id, features_df, deposits_df)
+            analysis = self.analyze_wallet(wallet_id, selected_features[wallet_id], selected_deposits[wallet_id])
             bottom_analyses.append(analysis)
             
         # Create report
@@ -110,26 +154,26 @@ class WalletAnalyzer:
             'analysis_timestamp': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
             'total_wallets_analyzed': len(features_df),
             'score_distribution': {
-                'mean': float(features_df['final_score'].mean()),
-                'median': float(features_df['final_score'].median()),
-                'std': float(features_df['final_score'].std()),
-                'min': float(features_df['final_score'].min()),
-                'max': float(features_df['final_score'].max())
+                'mean': features_df['final_score'].mean(),
+                'median': features_df['final_score'].median(),
+                'std': features_df['final_score'].std(),
+                'min': features_df['final_score'].min(),
+                'max': features_df['final_score'].max()
             },
             'top_performing_wallets': top_analyses,
             'bottom_performing_wallets': bottom_analyses,
             'key_findings': {
                 'top_wallets': {
-                    'avg_score': float(top_wallets['final_score'].mean()),
-                    'avg_deposits': float(top_wallets['total_deposits_count'].mean()),
-                    'avg_value_usd': float(top_wallets['total_deposit_usd'].mean()),
-                    'avg_assets': float(top_wallets['unique_assets_count'].mean())
+                    'avg_score': top_wallets['final_score'].mean(),
+                    'avg_deposits': top_wallets['total_deposits_count'].mean(),
+                    'avg_value_usd': top_wallets['total_deposit_usd'].mean(),
+                    'avg_assets': top_wallets['unique_assets_count'].mean()
                 },
                 'bottom_wallets': {
-                    'avg_score': float(bottom_wallets['final_score'].mean()),
-                    'avg_deposits': float(bottom_wallets['total_deposits_count'].mean()),
-                    'avg_value_usd': float(bottom_wallets['total_deposit_usd'].mean()),
-                    'avg_assets': float(bottom_wallets['unique_assets_count'].mean())
+                    'avg_score': bottom_wallets['final_score'].mean(),
+                    'avg_deposits': bottom_wallets['total_deposits_count'].mean(),
+                    'avg_value_usd': bottom_wallets['total_deposit_usd'].mean(),
+                    'avg_assets': bottom_wallets['unique_assets_count'].mean()
                 }
             }
         }
@@ -139,19 +183,18 @@ class WalletAnalyzer:
     def save_analysis(self, report: Dict):
         """Save the analysis report to a JSON file."""
         output_file = self.analysis_dir / "wallet_analysis.json"
-        with open(output_file, 'w') as f:
-            json.dump(report, f, indent=2)
+        output_file.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
         logger.info(f"Saved analysis report to {output_file}")
 
     def run(self):
         """Execute the full analysis pipeline."""
         try:
             # Load data
-            features_df, deposits_df = self.load_data()
+            features_df, deposits = self.load_data()
             logger.info(f"Loaded data for {len(features_df)} wallets")
 
             # Generate analysis report
-            report = self.generate_analysis_report(features_df, deposits_df)
+            report = self.generate_analysis_report(features_df, deposits)
             logger.info("Generated analysis report")
 
             # Save analysis
@@ -1,48 +1,155 @@
+import ijson
 import json
+import mmap
+import os
+import re
 from pathlib import Path
 
+# Characters of the problematic line shown before and after a parse error
+ERROR_CONTEXT = 100
+
+# Size of the text chunks read while locating a parse error
+READ_CHUNK_SIZE = 1 << 20
+
+def _value_type(event, value):
+    """Python type of the JSON value starting with the given parse event."""
+    if event == 'start_map':
+        return dict
+    if event == 'start_array':
+        return list
+    return type(value)
+
+def describe_structure(file):
+    """Describe the top-level structure of a JSON file by streaming its parse events.
+
+    Returns the root type and, for each top-level key (or a single None entry
+    for a root list), the value type, list length, first item type and first
+    item keys. Memory use does not depend on the file size.
+    """
+    events = ijson.parse(file, use_float=True)
+    _, event, value = next(events)
+    root_type = _value_type(event, value)
+    entries = {}
+    entry = None
+    if root_type is list:
+        entry = entries[None] = {'type': list, 'length': 0, 'first_type': None, 'first_keys': []}
+    item_depth = 1 if root_type is list else 2
+    depth = 1 if root_type in (dict, list) else 0
+
+    for _, event, value in events:
+        if event == 'map_key':
+            if depth == 1:
+                entry = entries[value] = {'type': None, 'length': 0, 'first_type': None, 'first_keys': []}
+            elif (depth == item_depth + 1 and entry['type'] is list
+                  and entry['length'] == 1 and entry['first_type'] is dict):
+                entry['first_keys'].append(value)
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+        else:
+            if depth == 1 and root_type is dict:
+                entry['type'] = _value_type(event, value)
+            elif depth == item_depth and entry['type'] is list:
+                entry['length'] += 1
+                if entry['length'] == 1:
+                    entry['first_type'] = _value_type(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+
+    return root_type, entries
+
+def locate_error(file_path):
+    """Locate the first JSON syntax error of a file as a character offset.
+
+    The C backend does not report positions, so the file is re-parsed with
+    ijson's pure-Python backend, which reports the offset of an unexpected
+    symbol. Other errors (bad literals, trailing data, truncation) carry no
+    offset; only then is the document decoded whole with the json module to
+    find it. Returns None when the error cannot be located.
+    """
+    with open(file_path, 'rb') as f:
+        try:
+            for _ in ijson.get_backend('python').parse(f):
+                pass
+        except ijson.JSONError as e:
+            match = re.search(r' at (\d+)$', str(e))
+            if match:
+                return int(match.group(1))
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            json.load(f)
+    except json.JSONDecodeError as e:
+        return e.pos
+    except ValueError:
+        pass
+    return None
+
+def error_context(file_path, offset):
+    """Line and column of a character offset, with the part of that line around it.
+
+    The file is streamed up to the offset, so only a bounded window of the
+    line is kept even when the whole document is on one line.
+    """
+    line_no, col_no, before = 1, 1, ''
+    with open(file_path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        read = 0
+        while read < offset and (chunk := f.read(min(READ_CHUNK_SIZE, offset - read))):
+            read += len(chunk)
+            line_no += chunk.count('\n')
+            if '\n' in chunk:
+                col_no = len(chunk) - chunk.rindex('\n')
+            else:
+                col_no += len(chunk)
+            before = (before + chunk).rsplit('\n', 1)[-1][-ERROR_CONTEXT:]
+        after = f.read(ERROR_CONTEXT).split('\n', 1)[0]
+    return line_no, col_no, before + after, len(before)
+
 def inspect_json_file(file_path):
     print(f"Inspecting file: {file_path}")
     try:
-        # First, read the file content
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            print(f"File size: {len(content)} bytes")
-            print(f"First 200 characters: {content[:200]}")
-            
-            # Try to parse as JSON
-            try:
-                data = json.loads(content)
-                print(f"\nSuccessfully parsed JSON")
-                print(f"Data type: {type(data)}")
-                if isinstance(data, dict):
-                    print("Keys:", list(data.keys()))
-                    for key, value in data.items():
-                        print(f"\nKey: {key}")
-                        print(f"Value type: {type(value)}")
-                        if isinstance(value, list) and value:
-                            print(f"First item type: {type(value[0])}")
-                            if isinstance(value[0], dict):
-                                print("First item keys:", list(value[0].keys()))
-                elif isinstance(data, list):
-                    print(f"List length: {len(data)}")
-                    if data:
-                        print("First item type:", type(data[0]))
-                        if isinstance(data[0], dict):
-                            print("First item keys:", list(data[0].keys()))
-            except json.JSONDecodeError as e:
-                print(f"\nError decoding JSON: {str(e)}")
-                # Print the problematic part of the content
-                line_no = e.lineno
-                col_no = e.colno
+        # First, peek at the file content without reading it into memory
+        # (an empty file cannot be mapped)
+        size = os.path.getsize(file_path)
+        print(f"File size: {size} bytes")
+        head = b''
+        if size:
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                head = mm[:200]
+        print(f"First 200 characters: {head.decode('utf-8', 'replace')}")
+
+        # Try to parse as JSON
+        try:
+            with open(file_path, 'rb') as f:
+                data_type, entries = describe_structure(f)
+            print(f"\nSuccessfully parsed JSON")
+            print(f"Data type: {data_type}")
+            if data_type is dict:
+                print("Keys:", list(entries.keys()))
+                for key, entry in entries.items():
+                    print(f"\nKey: {key}")
+                    print(f"Value type: {entry['type']}")
+                    if entry['type'] is list and entry['length']:
+                        print(f"First item type: {entry['first_type']}")
+                        if entry['first_type'] is dict:
+                            print("First item keys:", entry['first_keys'])
+            elif data_type is list:
+                entry = entries[None]
+                print(f"List length: {entry['length']}")
+                if entry['length']:
+                    print("First item type:", entry['first_type'])
+                    if entry['first_type'] is dict:
+                        print("First item keys:", entry['first_keys'])
+        except ijson.JSONError as e:
+            print(f"\nError decoding JSON: {str(e)}")
+            # Print the problematic part of the content
+            offset = locate_error(file_path)
+            if offset is not None:
+                line_no, col_no, line, caret = error_context(file_path, offset)
                 print(f"\nError at line {line_no}, column {col_no}")
-                lines = content.split('\n')
-                if line_no <= len(lines):
-                    print(f"Problematic line: {lines[line_no-1]}")
-                    print(" " * (col_no-1) + "^")
+                print(f"Problematic line: {line}")
+                print(" " * caret + "^")
     except Exception as e:
         print(f"Error reading file: {str(e)}")
 
 if __name__ == "__main__":
     file_path = Path("data/raw/compoundV2_transactions_ethereum_chunk_93.json")
-    inspect_json_file(file_path) 
\ No newline at end of file
+    inspect_json_file(file_path)
\ No newline at end of file
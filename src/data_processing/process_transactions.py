@@ -1,8 +1,12 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
-import json
-from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Tuple
+import ijson
+import pyarrow as pa
+import pyarrow.compute as pc
 import logging
 
 # Set up logging
@@ -12,6 +16,109 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DEPOSIT_SCHEMA = pa.schema([
+    ('account_id', pa.string()),
+    ('amount', pa.float64()),
+    ('amount_usd', pa.float64()),
+    ('asset', pa.string()),
+    ('asset_symbol', pa.string()),
+    ('block_number', pa.float64()),
+    ('timestamp', pa.timestamp('ns')),
+    ('transaction_hash', pa.string())
+])
+
+# Location of each output column in the raw (nested) deposit records
+DEPOSIT_FIELDS = {
+    'account_id': ('account', 'id'),
+    'amount': ('amount',),
+    'amount_usd': ('amountUSD',),
+    'asset': ('asset', 'id'),
+    'asset_symbol': ('asset', 'symbol'),
+    'block_number': ('blockNumber',),
+    'timestamp': ('timestamp',),
+    'transaction_hash': ('transaction', 'id')
+}
+
+# Numeric strings accepted in the raw records; anything else is coerced to
+# null, like pd.to_numeric(errors='coerce')
+NUMBER_PATTERN = r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$'
+
+# Number of deposits parsed from a file before they are flattened into a batch
+DEPOSIT_CHUNK_SIZE = 10000
+
+def _raw_type(paths: List[Tuple[str, ...]]) -> pa.StructType:
+    """Struct type of the raw records restricted to the given paths, with string leaves."""
+    children = {}
+    for path in paths:
+        children.setdefault(path[0], []).append(path[1:])
+    return pa.struct([
+        (name, pa.string() if rest == [()] else _raw_type(rest))
+        for name, rest in children.items()
+    ])
+
+# Raw deposit record type; other keys in the records are ignored
+RAW_DEPOSIT_TYPE = _raw_type(list(DEPOSIT_FIELDS.values()))
+
+def _as_strings(value: Any) -> Any:
+    """Turn the non-string leaves of a raw record (e.g. JSON numbers) into strings."""
+    if isinstance(value, dict):
+        return {key: _as_strings(item) for key, item in value.items()}
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+def _nested_field(column: pa.Array, path: Tuple[str, ...]) -> pa.Array:
+    """Extract a nested struct field; a missing parent yields null."""
+    for name in path:
+        column = pc.struct_field(column, name)
+    return column
+
+def _to_number(column: pa.Array, type: pa.DataType) -> pa.Array:
+    """Cast a string column to a numeric type, turning unparseable values into nulls."""
+    column = pc.utf8_trim_whitespace(column)
+    parseable = pc.match_substring_regex(column, NUMBER_PATTERN)
+    return pc.if_else(parseable, column, pa.scalar(None, pa.string())).cast(type)
+
+def _flatten_deposits(deposits: List[Dict[str, Any]]) -> pa.RecordBatch:
+    """Flatten raw deposit records into typed columns on the Arrow side."""
+    try:
+        raw = pa.array(deposits, type=RAW_DEPOSIT_TYPE)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Some values are JSON numbers rather than strings
+        raw = pa.array([_as_strings(deposit) for deposit in deposits], type=RAW_DEPOSIT_TYPE)
+    columns = {name: _nested_field(raw, path) for name, path in DEPOSIT_FIELDS.items()}
+    for name in ('asset', 'asset_symbol', 'transaction_hash'):
+        columns[name] = pc.fill_null(columns[name], '')
+    for name in ('amount', 'amount_usd', 'block_number'):
+        columns[name] = _to_number(columns[name], pa.float64())
+    columns['timestamp'] = (_to_number(columns['timestamp'], pa.float64())
+                            .cast(pa.int64(), safe=False).cast(pa.timestamp('s')))
+
+    return pa.RecordBatch.from_arrays(
+        [columns[field.name].cast(field.type) for field in DEPOSIT_SCHEMA],
+        schema=DEPOSIT_SCHEMA
+    )
+
+def _load_one(file: Path) -> pa.Table:
+    """Stream the deposits of a single transaction JSON file into an Arrow table."""
+    logger.info(f"Loading transactions from {file}")
+    batches = []
+    try:
+        with open(file, 'rb') as f:
+            deposits = ijson.items(f, 'deposits.item')
+            while chunk := list(islice(deposits, DEPOSIT_CHUNK_SIZE)):
+                batches.append(_flatten_deposits(chunk))
+    except Exception as e:
+        logger.error(f"Error loading {file}: {str(e)}")
+        return DEPOSIT_SCHEMA.empty_table()
+
+    table = pa.Table.from_batches(batches, schema=DEPOSIT_SCHEMA)
+    if table.num_rows:
+        logger.info(f"Found {table.num_rows} deposits in {file}")
+    else:
+        logger.warning(f"No deposits found in {file}")
+    return table
+
 class TransactionProcessor:
     def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
@@ -19,76 +126,35 @@ class TransactionProcessor:
         self.processed_dir = self.data_dir / "processed"
         self.processed_dir.mkdir(parents=True, exist_ok=True)
 
-    def load_transaction_files(self) -> List[Dict[str, Any]]:
-        """Load all transaction JSON files from the raw directory."""
-        all_deposits = []
-        for file in self.raw_dir.glob("*.json"):
-            logger.info(f"Loading transactions from {file}")
-            try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, dict) and 'deposits' in data:
-                        deposits = data['deposits']
-                        logger.info(f"Found {len(deposits)} deposits in {file}")
-                        all_deposits.extend(deposits)
-                    else:
-                        logger.warning(f"No deposits found in {file}")
-                        
-            except Exception as e:
-                logger.error(f"Error loading {file}: {str(e)}")
-                continue
-                
-        logger.info(f"Total deposits loaded: {len(all_deposits)}")
-        if all_deposits:
-            logger.info(f"Sample deposit keys: {list(all_deposits[0].keys())}")
-        return all_deposits
-
-    def process_transactions(self, deposits: List[Dict[str, Any]]) -> pd.DataFrame:
-        """Convert raw deposits to a structured DataFrame."""
-        if not deposits:
+    def load_transaction_files(self) -> pa.Table:
+        """Load all transaction JSON files from the raw directory in parallel."""
+        with ProcessPoolExecutor() as executor:
+            tables = list(executor.map(_load_one, self.raw_dir.glob("*.json")))
+
+        table = pa.concat_tables([DEPOSIT_SCHEMA.empty_table()] + tables)
+        logger.info(f"Total deposits loaded: {table.num_rows}")
+        return table
+
+    def process_transactions(self, deposits: pa.Table) -> pd.DataFrame:
+        """Convert the loaded deposits to a pandas DataFrame."""
+        if deposits.num_rows == 0:
             logger.warning("No deposits to process")
             return pd.DataFrame()
-            
+
         logger.info("Converting deposits to DataFrame")
-        
-        # Extract and flatten the nested data
-        processed_deposits = []
-        for deposit in deposits:
-            processed_deposit = {
-                'account_id': deposit['account']['id'],
-                'amount': deposit['amount'],
-                'amount_usd': deposit['amountUSD'],
-                'asset': deposit.get('asset', {}).get('id', ''),
-                'asset_symbol': deposit.get('asset', {}).get('symbol', ''),
-                'block_number': deposit.get('blockNumber', ''),
-                'timestamp': deposit.get('timestamp', ''),
-                'transaction_hash': deposit.get('transaction', {}).get('id', '')
-            }
-            processed_deposits.append(processed_deposit)
-            
-        df = pd.DataFrame(processed_deposits)
+        df = deposits.to_pandas()
         logger.info(f"DataFrame columns: {df.columns.tolist()}")
-        
-        # Convert types
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
-        if 'amount' in df.columns:
-            df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
-        if 'amount_usd' in df.columns:
-            df['amount_usd'] = pd.to_numeric(df['amount_usd'], errors='coerce')
-        if 'block_number' in df.columns:
-            df['block_number'] = pd.to_numeric(df['block_number'], errors='coerce')
-            
+
         return df
 
     def save_processed_data(self, df: pd.DataFrame):
-        """Save processed data to CSV."""
+        """Save processed data to Parquet."""
         if df.empty:
             logger.warning("No data to save")
             return
             
-        output_file = self.processed_dir / "processed_deposits.csv"
-        df.to_csv(output_file, index=False)
+        output_file = self.processed_dir / "processed_deposits.parquet"
+        df.to_parquet(output_file, engine='pyarrow', compression='zstd', index=False)
         logger.info(f"Saved processed data to {output_file}")
 
     def run(self):
@@ -96,7 +162,7 @@ class TransactionProcessor:
         try:
             # Load raw deposits
             deposits = self.load_transaction_files()
-            logger.info(f"Loaded {len(deposits)} deposits")
+            logger.info(f"Loaded {deposits.num_rows} deposits")
 
             # Process deposits
             processed_df = self.process_transactions(deposits)
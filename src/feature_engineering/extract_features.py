@@ -2,8 +2,11 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import logging
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from datetime import datetime, timedelta
+import polars as pl
+import pyarrow as pa
+import pyarrow.csv as pcsv
 
 # Set up logging
 logging.basicConfig(
@@ -12,6 +15,40 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Features feeding the component scores, and the value at which each saturates
+SCORE_INPUTS = [
+    'total_deposits_count', 'deposit_consistency', 'unique_assets_ratio',
+    'total_deposit_usd', 'deposit_value_consistency', 'asset_concentration',
+    'deposit_timespan_days', 'avg_days_between_deposits'
+]
+SCORE_INPUT_CAPS = np.array([100, 1, 1, 10000, 1, 1, 365, 30], dtype=np.float32)
+
+# Weight of each normalized input (rows, in SCORE_INPUTS order) in the
+# activity, value and longevity scores (columns)
+COMPONENT_WEIGHTS = np.array([
+    [0.4, 0.0, 0.0],  # total_deposits_count
+    [0.3, 0.0, 0.0],  # deposit_consistency
+    [0.3, 0.0, 0.0],  # unique_assets_ratio
+    [0.0, 0.4, 0.0],  # total_deposit_usd
+    [0.0, 0.3, 0.0],  # deposit_value_consistency
+    [0.0, 0.3, 0.0],  # 1 - asset_concentration
+    [0.0, 0.0, 0.6],  # deposit_timespan_days
+    [0.0, 0.0, 0.4]   # avg_days_between_deposits
+], dtype=np.float32)
+
+# Weight of the activity, value and longevity scores in the final score
+SCORE_WEIGHTS = np.array([0.4, 0.4, 0.2], dtype=np.float32)
+
+def _write_csv(table: pa.Table, output_file: Path):
+    """Write a table to CSV unquoted, as pandas did, unless a value needs quotes."""
+    try:
+        with open(output_file, 'wb') as f:
+            f.write((','.join(table.column_names) + '\n').encode())
+            pcsv.write_csv(table, f, pcsv.WriteOptions(include_header=False, quoting_style='none'))
+    except pa.ArrowInvalid:
+        # Some value contains a comma, quote or line break
+        pcsv.write_csv(table, output_file)
+
 class FeatureEngineer:
     def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
@@ -19,83 +56,119 @@ class FeatureEngineer:
         self.features_dir = self.data_dir / "processed" / "features"
         self.features_dir.mkdir(parents=True, exist_ok=True)
 
-    def load_processed_data(self) -> pd.DataFrame:
-        """Load the processed deposits data."""
-        input_file = self.processed_dir / "processed_deposits.csv"
-        df = pd.read_csv(input_file)
+    def load_processed_data(self) -> pl.LazyFrame:
+        """Lazily scan the processed deposits data."""
+        input_file = self.processed_dir / "processed_deposits.parquet"
+        return pl.scan_parquet(input_file)
+
+    def aggregate_deposits(self, deposits: pl.LazyFrame) -> Tuple[pd.DataFrame, int]:
+        """Aggregate the deposits of each wallet on the streaming engine.
+
+        Every aggregation over the deposits is one that streams, so they are
+        never loaded into memory at once. Returns the per-wallet aggregates
+        and the number of distinct assets.
+        """
+        ts_ns = pl.col('timestamp').dt.epoch('ns')
+        per_wallet = deposits.group_by('account_id').agg(
+            pl.len().cast(pl.Int64).alias('count'),
+            ts_ns.min().alias('first_ts_ns'),
+            ts_ns.max().alias('last_ts_ns'),
+            pl.col('amount').sum().alias('amount_sum'),
+            pl.col('amount').mean().alias('amount_mean'),
+            pl.col('amount_usd').sum().alias('usd_sum'),
+            pl.col('amount_usd').mean().alias('usd_mean'),
+            pl.col('amount_usd').std().alias('usd_std'),
+            pl.col('amount_usd').min().alias('usd_min'),
+            pl.col('amount_usd').max().alias('usd_max')
+        )
         
-        # Convert timestamp to datetime if needed
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            
-        return df
+        # Intervals between consecutive deposits of the same wallet, from the
+        # deposits sorted by wallet and time
+        intervals = deposits.select('account_id', ts_ns.alias('ts_ns')).sort('account_id', 'ts_ns').select(
+            'account_id',
+            pl.when(pl.col('account_id') == pl.col('account_id').shift())
+            .then(pl.col('ts_ns').diff() / 1e9)
+            .alias('interval')
+        ).group_by('account_id').agg(
+            pl.col('interval').mean().alias('interval_mean'),
+            pl.col('interval').std().alias('interval_std')
+        )
+        
+        # Deposit counts per wallet and asset give the asset diversity, the
+        # preferred asset (ties go to the lowest asset id, like pandas mode())
+        # and the Herfindahl index of each wallet
+        pairs = deposits.group_by('account_id', 'asset').agg(pl.len().alias('asset_count'))
+        asset_count = pl.col('asset_count').cast(pl.Float64)
+        asset_usage = pairs.group_by('account_id').agg(
+            pl.len().cast(pl.Int64).alias('unique_assets'),
+            (asset_count.pow(2).sum() / asset_count.sum().pow(2)).alias('asset_concentration')
+        )
+        most_used = pairs.join(
+            pairs.group_by('account_id').agg(pl.col('asset_count').max()),
+            on=['account_id', 'asset_count']
+        ).group_by('account_id').agg(pl.col('asset').min().alias('most_used_asset'))
+        
+        aggregates = (
+            per_wallet
+            .join(intervals, on='account_id')
+            .join(asset_usage, on='account_id')
+            .join(most_used, on='account_id')
+            .sort('account_id')
+        )
+        all_assets = pairs.select(pl.col('asset').n_unique())
+        
+        # Run both queries together on the streaming engine
+        aggregates, asset_count = pl.collect_all([aggregates, all_assets], engine='streaming')
+        return aggregates.to_pandas().set_index('account_id'), asset_count.item()
 
-    def calculate_time_based_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def calculate_time_based_features(self, aggregates: pd.DataFrame) -> pd.DataFrame:
         """Calculate time-based features for each wallet."""
-        # Group by account
-        grouped = df.groupby('account_id')
-        
-        features = pd.DataFrame()
-        features['first_deposit_time'] = grouped['timestamp'].min()
-        features['last_deposit_time'] = grouped['timestamp'].max()
-        features['deposit_timespan_days'] = (features['last_deposit_time'] - features['first_deposit_time']).dt.total_seconds() / (24 * 3600)
-        features['total_deposits_count'] = grouped.size()
+        first_ns = aggregates['first_ts_ns'].to_numpy()
+        last_ns = aggregates['last_ts_ns'].to_numpy()
+        
+        features = pd.DataFrame(index=aggregates.index)
+        features['first_deposit_time'] = first_ns.view('datetime64[ns]')
+        features['last_deposit_time'] = last_ns.view('datetime64[ns]')
+        features['deposit_timespan_days'] = (last_ns - first_ns) / (24 * 3600 * 1e9)
+        features['total_deposits_count'] = aggregates['count']
         features['avg_days_between_deposits'] = features['deposit_timespan_days'] / features['total_deposits_count']
         
-        # Calculate deposit frequency consistency
-        def calc_deposit_consistency(group):
-            if len(group) < 2:
-                return 0
-            timestamps = pd.to_datetime(group['timestamp'])
-            deposit_intervals = timestamps.sort_values().diff().dropna()
-            return 1 - deposit_intervals.dt.total_seconds().std() / deposit_intervals.dt.total_seconds().mean() if len(deposit_intervals) > 0 else 0
-            
-        features['deposit_consistency'] = grouped.apply(calc_deposit_consistency)
+        # Calculate deposit frequency consistency from the intervals between
+        # consecutive deposits of the same wallet
+        features['deposit_consistency'] = (1 - aggregates['interval_std'] / aggregates['interval_mean']).fillna(0)
         
         return features
 
-    def calculate_value_based_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def calculate_value_based_features(self, aggregates: pd.DataFrame) -> pd.DataFrame:
         """Calculate value-based features for each wallet."""
-        # Group by account
-        grouped = df.groupby('account_id')
-        
-        features = pd.DataFrame()
-        features['total_deposit_amount'] = grouped['amount'].sum()
-        features['total_deposit_usd'] = grouped['amount_usd'].sum()
-        features['avg_deposit_amount'] = grouped['amount'].mean()
-        features['avg_deposit_usd'] = grouped['amount_usd'].mean()
-        features['max_deposit_usd'] = grouped['amount_usd'].max()
-        features['min_deposit_usd'] = grouped['amount_usd'].min()
-        features['deposit_usd_std'] = grouped['amount_usd'].std()
+        features = pd.DataFrame(index=aggregates.index)
+        features['total_deposit_amount'] = aggregates['amount_sum']
+        features['total_deposit_usd'] = aggregates['usd_sum']
+        # Means skip deposits whose amounts could not be parsed
+        features['avg_deposit_amount'] = aggregates['amount_mean']
+        features['avg_deposit_usd'] = aggregates['usd_mean']
+        features['max_deposit_usd'] = aggregates['usd_max']
+        features['min_deposit_usd'] = aggregates['usd_min']
+        features['deposit_usd_std'] = aggregates['usd_std']
         
         # Calculate value consistency
         features['deposit_value_consistency'] = 1 - (features['deposit_usd_std'] / features['avg_deposit_usd']).fillna(0)
         
         return features
 
-    def calculate_asset_based_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def calculate_asset_based_features(self, aggregates: pd.DataFrame, total_assets: int) -> pd.DataFrame:
         """Calculate asset diversity and usage pattern features."""
-        # Group by account
-        grouped = df.groupby('account_id')
-        
-        features = pd.DataFrame()
+        features = pd.DataFrame(index=aggregates.index)
         
         # Asset diversity
-        features['unique_assets_count'] = grouped['asset'].nunique()
-        features['unique_assets_ratio'] = features['unique_assets_count'] / df['asset'].nunique()
-        
-        # Calculate preferred assets
-        def get_most_used_asset(group):
-            return group['asset'].mode().iloc[0] if not group.empty else ''
-        features['most_used_asset'] = grouped.apply(get_most_used_asset)
-        
-        # Asset usage concentration
-        def calc_asset_concentration(group):
-            asset_counts = group['asset'].value_counts()
-            total_count = asset_counts.sum()
-            return (asset_counts * asset_counts).sum() / (total_count * total_count) if total_count > 0 else 1
-            
-        features['asset_concentration'] = grouped.apply(calc_asset_concentration)
+        features['unique_assets_count'] = aggregates['unique_assets']
+        features['unique_assets_ratio'] = features['unique_assets_count'] / total_assets
+        
+        # Preferred asset (ties go to the lowest asset id, like mode())
+        features['most_used_asset'] = aggregates['most_used_asset']
+        
+        # Asset usage concentration (Herfindahl index of deposit counts)
+        features['asset_concentration'] = aggregates['asset_concentration']
         
         return features
 
@@ -107,60 +180,59 @@ class FeatureEngineer:
         # Fill missing values
         features = features.fillna(0)
         
-        # Calculate component scores (0-1 range)
-        features['activity_score'] = (
-            features['total_deposits_count'].clip(0, 100) / 100 * 0.4 +
-            features['deposit_consistency'].clip(0, 1) * 0.3 +
-            features['unique_assets_ratio'].clip(0, 1) * 0.3
-        )
-        
-        features['value_score'] = (
-            (features['total_deposit_usd'].clip(0, 10000) / 10000) * 0.4 +
-            features['deposit_value_consistency'].clip(0, 1) * 0.3 +
-            (1 - features['asset_concentration']) * 0.3
-        )
+        # Normalize the score inputs (0-1 range) in place on one float32 matrix;
+        # asset concentration already lies in (0, 1] and scores its complement
+        inputs = features[SCORE_INPUTS].to_numpy(dtype=np.float32)
+        np.divide(inputs, SCORE_INPUT_CAPS, out=inputs)
+        np.clip(inputs, 0, 1, out=inputs)
+        concentration = SCORE_INPUTS.index('asset_concentration')
+        np.subtract(1, inputs[:, concentration], out=inputs[:, concentration])
         
-        features['longevity_score'] = (
-            (features['deposit_timespan_days'].clip(0, 365) / 365) * 0.6 +
-            (features['avg_days_between_deposits'].clip(0, 30) / 30) * 0.4
-        )
+        # Calculate component scores (0-1 range)
+        scores = inputs @ COMPONENT_WEIGHTS
+        features['activity_score'] = scores[:, 0]
+        features['value_score'] = scores[:, 1]
+        features['longevity_score'] = scores[:, 2]
         
         # Calculate final score (0-100 range)
-        features['final_score'] = (
-            features['activity_score'] * 0.4 +
-            features['value_score'] * 0.4 +
-            features['longevity_score'] * 0.2
-        ) * 100
+        features['final_score'] = scores @ (SCORE_WEIGHTS * 100)
         
         return features
 
     def save_features(self, features: pd.DataFrame):
-        """Save the engineered features to CSV."""
-        output_file = self.features_dir / "wallet_features.csv"
-        features.to_csv(output_file)
+        """Save the engineered features to Parquet and the top wallets to CSV."""
+        output_file = self.features_dir / "wallet_features.parquet"
+        features.to_parquet(output_file, engine='pyarrow', compression='zstd')
         logger.info(f"Saved features to {output_file}")
         
         # Save top 1000 wallets by score
-        top_wallets = features.sort_values('final_score', ascending=False).head(1000)
+        top_wallets = features.nlargest(1000, 'final_score')
         top_wallets_file = self.features_dir / "top_1000_wallets.csv"
-        top_wallets.to_csv(top_wallets_file)
+        table = pa.Table.from_pandas(top_wallets.reset_index(), preserve_index=False)
+        # Write deposit times to the second, as pandas did
+        table = table.cast(pa.schema([
+            pa.field(field.name, pa.timestamp('s')) if pa.types.is_timestamp(field.type) else field
+            for field in table.schema
+        ]))
+        _write_csv(table, top_wallets_file)
         logger.info(f"Saved top 1000 wallets to {top_wallets_file}")
 
     def run(self):
         """Execute the full feature engineering pipeline."""
         try:
-            # Load processed data
-            df = self.load_processed_data()
-            logger.info(f"Loaded {len(df)} processed deposits")
+            # Scan processed data and aggregate deposits per wallet
+            deposits = self.load_processed_data()
+            aggregates, total_assets = self.aggregate_deposits(deposits)
+            logger.info(f"Aggregated {aggregates['count'].sum()} processed deposits")
 
             # Calculate features
-            time_features = self.calculate_time_based_features(df)
+            time_features = self.calculate_time_based_features(aggregates)
             logger.info("Calculated time-based features")
             
-            value_features = self.calculate_value_based_features(df)
+            value_features = self.calculate_value_based_features(aggregates)
             logger.info("Calculated value-based features")
             
-            asset_features = self.calculate_asset_based_features(df)
+            asset_features = self.calculate_asset_based_features(aggregates, total_assets)
             logger.info("Calculated asset-based features")
 
             # Combine features and calculate scores
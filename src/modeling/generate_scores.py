@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import logging
+import pyarrow as pa
+import pyarrow.csv as pcsv
 from sklearn.preprocessing import MinMaxScaler
 from typing import Dict, List, Tuple
 
@@ -12,98 +14,68 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _write_csv(table: pa.Table, output_file: Path):
+    """Write a table to CSV unquoted, as pandas did, unless a value needs quotes."""
+    try:
+        with open(output_file, 'wb') as f:
+            f.write((','.join(table.column_names) + '\n').encode())
+            pcsv.write_csv(table, f, pcsv.WriteOptions(include_header=False, quoting_style='none'))
+    except pa.ArrowInvalid:
+        # Some value contains a comma, quote or line break
+        pcsv.write_csv(table, output_file)
+
 class WalletScorer:
-    def __init__(self, data_dir: str = "../../data"):
+    def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
         self.features_dir = self.data_dir / "processed" / "features"
         self.scores_dir = self.data_dir / "processed" / "scores"
         self.scores_dir.mkdir(parents=True, exist_ok=True)
-        self.scaler = MinMaxScaler()
 
     def load_features(self) -> pd.DataFrame:
         """Load the engineered features."""
-        input_file = self.features_dir / "wallet_features.csv"
-        return pd.read_csv(input_file)
+        input_file = self.features_dir / "wallet_features.parquet"
+        return pd.read_parquet(input_file, engine='pyarrow').reset_index()
 
     def calculate_base_score(self, features: pd.DataFrame) -> pd.Series:
-        """Calculate the base score from transaction patterns."""
-        # Normalize features
-        numeric_cols = features.select_dtypes(include=[np.number]).columns
-        normalized_features = pd.DataFrame(
-            self.scaler.fit_transform(features[numeric_cols]),
-            columns=numeric_cols
-        )
-
+        """Calculate the base score from deposit patterns."""
         # Weight different components
         weights = {
-            'tx_count': 0.2,
-            'tx_frequency': 0.15,
-            'total_value': 0.2,
-            'avg_value': 0.15,
-            'unique_contracts': 0.15,
-            'wallet_age_days': 0.15
-        }
-
-        # Calculate weighted score
-        base_score = sum(
-            normalized_features[col] * weight
-            for col, weight in weights.items()
-        )
-
-        return base_score
-
-    def calculate_risk_score(self, features: pd.DataFrame) -> pd.Series:
-        """Calculate risk adjustment factor."""
-        # Define risk indicators
-        risk_indicators = {
-            'value_std': 0.3,  # High value volatility
-            'std_time_between_tx': 0.3,  # Irregular transaction timing
-            'avg_gas_cost': 0.2,  # High gas costs
-            'total_gas_cost': 0.2  # Total gas expenditure
+            'total_deposits_count': 0.2,
+            'avg_days_between_deposits': 0.15,
+            'total_deposit_usd': 0.2,
+            'avg_deposit_usd': 0.15,
+            'unique_assets_count': 0.15,
+            'deposit_timespan_days': 0.15
         }
 
-        # Normalize risk indicators
-        risk_features = features[list(risk_indicators.keys())]
-        normalized_risk = pd.DataFrame(
-            self.scaler.fit_transform(risk_features),
-            columns=risk_features.columns
-        )
+        # Normalize the weighted features
+        normalized_features = MinMaxScaler().fit_transform(features[list(weights)].to_numpy())
 
-        # Calculate weighted risk score
-        risk_score = sum(
-            normalized_risk[col] * weight
-            for col, weight in risk_indicators.items()
-        )
+        # Calculate weighted score as a single matrix-vector product
+        base_score = normalized_features @ np.array(list(weights.values()))
 
-        return risk_score
+        return pd.Series(base_score, index=features.index)
 
-    def calculate_final_score(self, base_score: pd.Series,
-                            risk_score: pd.Series) -> pd.Series:
+    def calculate_final_score(self, base_score: pd.Series) -> pd.Series:
         """Calculate final wallet score (0-100)."""
-        # Combine scores with risk adjustment
-        final_score = base_score * (1 - risk_score)
+        # Scale to 0-100 range (a constant score maps to 0, as with MinMaxScaler)
+        values = base_score.to_numpy()
+        value_range = values.max() - values.min()
+        scaled = (values - values.min()) / (value_range if value_range else 1.0) * 100
         
-        # Scale to 0-100 range
-        final_score = self.scaler.fit_transform(
-            final_score.values.reshape(-1, 1)
-        ).flatten() * 100
-        
-        return pd.Series(final_score, index=base_score.index)
+        return pd.Series(scaled, index=base_score.index)
 
     def save_scores(self, features: pd.DataFrame, scores: pd.Series):
         """Save wallet scores to CSV."""
         # Create results DataFrame
         results = pd.DataFrame({
-            'wallet_address': features['from'],
+            'wallet_address': features['account_id'],
             'score': scores
         })
         
-        # Sort by score
-        results = results.sort_values('score', ascending=False)
-        
-        # Save top 1000 wallets
+        # Save top 1000 wallets by score
         output_file = self.scores_dir / "wallet_scores.csv"
-        results.head(1000).to_csv(output_file, index=False)
+        _write_csv(pa.Table.from_pandas(results.nlargest(1000, 'score'), preserve_index=False), output_file)
         logger.info(f"Saved scores to {output_file}")
 
     def run(self):
@@ -115,8 +87,7 @@ class WalletScorer:
 
             # Calculate scores
             base_score = self.calculate_base_score(features)
-            risk_score = self.calculate_risk_score(features)
-            final_score = self.calculate_final_score(base_score, risk_score)
+            final_score = self.calculate_final_score(base_score)
 
             # Save scores
             self.save_scores(features, final_score)